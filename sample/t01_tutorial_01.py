@@ -19,7 +19,7 @@ request = yacedar.Request(
     resource='Photo::"VacationPhoto94.jpg"',
 )
 
-authorizer = yacedar.Authorizer()
+authorizer = yacedar.CachedAuthorizer()
 response = authorizer.is_authorized(request, policy_set)
 
 # expected: True
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
-import argparse
 import cmd
+import functools
+import os
 import pathlib
+import pickle
+import re
 import shlex
-import textwrap
-from typing import Any, Callable, Literal, NewType
-import typing
+import sys
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Literal, NewType
 
-import yaml
+if TYPE_CHECKING:
+    import argparse
 
 
 def trap[T](fn: Callable[[], T]) -> tuple[T, Literal[None]] | tuple[Literal[None], Exception]:
@@ -23,7 +28,13 @@ TTaskNo = NewType('TTaskNo', int)
 TListNo = NewType('TListNo', int)
 
 
+def intern_user_name(name: str) -> TUserName:
+    return TUserName(sys.intern(name))
+
+
 class TUser:
+    __slots__ = ('name',)
+
     def __init__(
         self,
         name: TUserName,
@@ -35,19 +46,21 @@ class TUser:
 
 
 class TList:
+    __slots__ = ('list_no', 'list_name', 'owner', 'reader', 'editer')
+
     def __init__(
         self,
         list_no: TListNo,
         list_name: str,
         owner: TUserName,
-        reader: list[TUserName] = [],
-        editer: list[TUserName] = [],
+        reader: set[TUserName] | None = None,
+        editer: set[TUserName] | None = None,
     ):
         self.list_no = list_no
         self.list_name = list_name
         self.owner = owner
-        self.reader = reader
-        self.editer = editer
+        self.reader = set() if reader is None else reader
+        self.editer = set() if editer is None else editer
 
     def disp(self, oneline: bool = False) -> str:
         if oneline:
@@ -60,6 +73,10 @@ List Name: {self.list_name}'''
 
 
 class TTask:
+    __slots__ = ('list_no', 'task_no', 'task_name', 'status')
+
+    status_marks = ('[ ]', '[x]')
+
     def __init__(
         self,
         list_no: TListNo,
@@ -73,48 +90,64 @@ class TTask:
         self.status = status
 
     def disp(self, oneline: bool = False) -> str:
-        return f'{"[x]" if self.status else "[ ]"} {self.task_name}'
+        return f'{self.status_marks[self.status]} {self.task_name}'
 
 
 class TDatabase:
     def __init__(
         self,
-        users: dict[TUserName, TUser] = {},
-        lists: dict[TListNo, TList] = {},
-        tasks: dict[TListNo, dict[TTaskNo, TTask]] = {},
+        users: dict[TUserName, TUser] | None = None,
+        lists: dict[TListNo, TList] | None = None,
+        tasks: dict[TListNo, dict[TTaskNo, TTask]] | None = None,
+        next_list_no: TListNo | None = None,
+        next_task_no: dict[TListNo, TTaskNo] | None = None,
     ):
-        self.users = users
-        self.lists = lists
-        self.tasks = tasks
+        self.users = {} if users is None else users
+        self.lists = {} if lists is None else lists
+        self.tasks = {} if tasks is None else tasks
+
+        if next_list_no is None:
+            next_list_no = TListNo(max(self.lists.keys(), default=-1) + 1)
+
+        if next_task_no is None:
+            next_task_no = {
+                list_no: TTaskNo(max(tasks_.keys(), default=-1) + 1)
+                for list_no, tasks_ in self.tasks.items()
+            }
+
+        self.next_list_no = next_list_no
+        self.next_task_no = next_task_no
 
     @classmethod
     def from_dict(cls, dct: dict[str, Any]) -> TDatabase:
-        return cls(
-            users={
-                TUserName(name): TUser(name=name)
-                for name in dct['users']
-            },
-            lists={
-                TListNo(no): TList(
-                    list_no=no,
-                    list_name=val['list_name'],
-                    owner=TUserName(val['owner'])
-                )
-                for no, val in dct['lists'].items()
-            },
-            tasks={
-                TListNo(list_no): {
-                    TTaskNo(task_no): TTask(
-                        list_no=TListNo(list_no),
-                        task_no=TTaskNo(task_no),
-                        task_name=task['task_name'],
-                        status=task['status']
-                    )
-                    for task_no, task in list_.items()
-                }
-                for list_no, list_ in dct['tasks'].items()
-            },
-        )
+        users: dict[TUserName, TUser] = {}
+        for name in dct['users']:
+            user_name = intern_user_name(name)
+            users[user_name] = TUser(user_name)
+
+        lists: dict[TListNo, TList] = {}
+        tasks: dict[TListNo, dict[TTaskNo, TTask]] = {}
+        next_list_no = 0
+        for no, val in dct['lists'].items():
+            list_no = TListNo(no)
+            lists[list_no] = TList(list_no, val['list_name'], intern_user_name(val['owner']))
+            tasks[list_no] = {}
+            if list_no >= next_list_no:
+                next_list_no = list_no + 1
+
+        next_task_no: dict[TListNo, TTaskNo] = {}
+        for no, list_ in dct['tasks'].items():
+            list_no = TListNo(no)
+            tasks_ = tasks.setdefault(list_no, {})
+            next_no = 0
+            for no_, task in list_.items():
+                task_no = TTaskNo(no_)
+                tasks_[task_no] = TTask(list_no, task_no, task['task_name'], task['status'])
+                if task_no >= next_no:
+                    next_no = task_no + 1
+            next_task_no[list_no] = TTaskNo(next_no)
+
+        return cls(users, lists, tasks, TListNo(next_list_no), next_task_no)
 
     def put_user(self, obj: TUser) -> None:
         self.users[obj.name] = obj
@@ -122,28 +155,40 @@ class TDatabase:
     def put_list(self, obj: TList) -> None:
         self.lists[obj.list_no] = obj
 
-    def put_task(self, obj: TTask) -> None:
         if obj.list_no not in self.tasks:
             self.tasks[obj.list_no] = {}
 
+    def put_task(self, obj: TTask) -> None:
         self.tasks[obj.list_no][obj.task_no] = obj
 
+    def delete_list(self, list_no: TListNo) -> None:
+        del self.lists[list_no]
+        del self.tasks[list_no]
+        self.next_task_no.pop(list_no, None)
+
     def get_new_list_no(self) -> TListNo:
-        return TListNo(max(self.lists.keys()) + 1)
+        list_no = self.next_list_no
+        self.next_list_no = TListNo(list_no + 1)
+        return list_no
 
     def get_new_task_no(self, list_no: TListNo) -> TTaskNo:
-        return TTaskNo(max(self.tasks[list_no].keys()) + 1)
+        if list_no not in self.lists:
+            raise KeyError(list_no)
+
+        task_no = self.next_task_no.get(list_no, TTaskNo(0))
+        self.next_task_no[list_no] = TTaskNo(task_no + 1)
+        return task_no
 
     def disp_user(self, obj: TUser) -> str:
         return obj.disp()
 
     def disp_list(self, obj: TList) -> str:
-        tasks = '\n'.join([task.disp(oneline=True) for task in self.tasks[obj.list_no].values()])
+        tasks = '\n'.join([f'  {task.disp(oneline=True)}' for task in self.tasks[obj.list_no].values()])
 
         return f'''\
 {obj.disp()}
 Tasks:
-{textwrap.indent(tasks, '  ')}'''
+{tasks}'''
 
     def disp_task(self, obj: TTask) -> str:
         return obj.disp()
@@ -153,173 +198,312 @@ class InvalidArgumentError(Exception):
     pass
 
 
+USAGE_LOGIN = 'login <user_name>'
+USAGE_LOGOUT = 'logout'
+USAGE_PUT_LIST = 'put_list <list_name>'
+USAGE_GET_LISTS = 'get_lists'
+USAGE_GET_LIST = 'get_list [<owner_name>/]<list_no>'
+USAGE_DELETE_LIST = 'delete_list <list_no>'
+USAGE_SHARE_LIST = 'share_list <list_no> <user_name> <reader|editer>'
+USAGE_PUT_TASK = 'put_task <list_no> <task_name>'
+USAGE_TOGGLE_TASK = 'toggle_task [<owner_name>/]<list_no> <task_no>'
+USAGE_DELETE_TASK = 'delete_task [<owner_name>/]<list_no> <task_no>'
+
+
+# shlex only treats these as separators; str.split() would also split on
+# e.g. U+3000 or form feed, which shlex keeps inside a token.
+SHLEX_WHITESPACE = re.compile(r'[ \t\r\n]+')
+
+
+@functools.lru_cache(maxsize=256)
+def split_line(line: str) -> tuple[str, ...]:
+    if '"' in line or "'" in line or '\\' in line:
+        return tuple(shlex.split(line))
+
+    return tuple(filter(None, SHLEX_WHITESPACE.split(line)))
+
+
 class TinyTodoShell(cmd.Cmd):
     intro = 'Welcome to the tinytodo shell. Type help or ? to list commands.\n'
-    prompt = 'tinytodo(guest)> '
+    guest_prompt = 'tinytodo(guest)> '
+    prompt = guest_prompt
 
     __login: TUserName = TUserName('guest')
     __db: TDatabase = TDatabase()
+    __db_loader: threading.Thread | None = None
+    __db_loader_error: BaseException | None = None
+
+    _cmd_table: dict[str, Callable[[TinyTodoShell, str], bool | None]] = {}
+
+    def load_db_in_background(self, fn: Callable[[], TDatabase]) -> None:
+        def load() -> None:
+            try:
+                self.__db = fn()
+            except BaseException as e:
+                self.__db_loader_error = e
+
+        self.__db_loader = threading.Thread(target=load, daemon=True)
+        self.__db_loader.start()
+
+    def wait_db_loader(self) -> None:
+        if self.__db_loader is None:
+            return
+
+        self.__db_loader.join()
+        self.__db_loader = None
+
+        if (e := self.__db_loader_error) is not None:
+            self.__db_loader_error = None
+            raise e
+
+    def _write_error(self, kind: str, message: str) -> None:
+        self.stdout.write(f'ERROR({kind}): {message}\n')
+
+    def _split_args(self, line: str, expected_len: int, help: str) -> tuple[str, ...] | None:
+        if expected_len == 0:
+            if line.strip(' \t\r\n'):
+                self._write_error(InvalidArgumentError.__name__, help)
+                return None
+
+            return ()
+
+        args = split_line(line)
 
-    def _assert_args_len(self, expected_len: int, args: list[str], help: str) -> None:
         if len(args) != expected_len:
-            raise InvalidArgumentError(help)
+            self._write_error(InvalidArgumentError.__name__, help)
+            return None
 
-    def _parse_list_name(self, arg: str) -> tuple[TUserName, TListNo]:
-        if '/' in arg:
-            owner_, list_no_ = arg.split('/', 1)
+        return args
 
-            owner = TUserName(owner_)
-            arg = list_no_
+    def _parse_list_no(self, arg: str) -> TListNo:
+        owner, sep, list_no_ = arg.partition('/')
 
-        else:
-            owner = self.__login
+        if not sep:
+            return TListNo(int(arg))
+
+        list_no = TListNo(int(list_no_))
+        if self.__db.lists[list_no].owner != owner:
+            raise InvalidArgumentError(f'List {list_no} is not owned by {owner}.')
+
+        return list_no
+
+    def _get_task_table(self, arg: str) -> tuple[TListNo, dict[TTaskNo, TTask]]:
+        list_no = self._parse_list_no(arg)
 
-        return owner, TListNo(int(arg))
+        return list_no, self.__db.tasks[list_no]
 
     def do_login(self, line: str) -> None:
-        args = shlex.split(line)
-        self._assert_args_len(1, args, 'login <user_name>')
+        if (args := self._split_args(line, 1, USAGE_LOGIN)) is None:
+            return
 
-        self.__login = TUserName(args[0])
+        login = self.__login = intern_user_name(args[0])
 
-        if self.__login not in self.__db.users:
-            self.__db.users[self.__login] = TUser(name=self.__login)
+        users = self.__db.users
+        if login not in users:
+            users[login] = TUser(name=login)
 
-        print(f'Logged in as {self.__login}')
+        self.prompt = f'tinytodo({login})> '
+
+        self.stdout.write(f'Logged in as {login}\n')
 
     def do_logout(self, line: str) -> None:
-        args = shlex.split(line)
-        self._assert_args_len(0, args, 'logout')
+        if self._split_args(line, 0, USAGE_LOGOUT) is None:
+            return
 
-        self.__login = TUserName('guest')
+        login = self.__login = TUserName('guest')
+        self.prompt = self.guest_prompt
 
-        print(f'Logged out.  Now you are {self.__login}')
+        self.stdout.write(f'Logged out.  Now you are {login}\n')
 
     def do_put_list(self, line: str) -> None:
-        args = shlex.split(line)
-        self._assert_args_len(1, args, 'put_list <list_name>')
+        if (args := self._split_args(line, 1, USAGE_PUT_LIST)) is None:
+            return
 
-        list_no = self.__db.get_new_list_no()
+        db = self.__db
+        list_no = db.get_new_list_no()
 
-        self.__db.put_list(TList(
+        db.put_list(TList(
             list_no=list_no,
             list_name=args[0],
             owner=self.__login,
         ))
 
-        print(f'List {list_no} created.')
+        self.stdout.write(f'List {list_no} created.\n')
 
     def do_get_lists(self, line: str) -> None:
-        args = shlex.split(line)
-        self._assert_args_len(0, args, 'get_lists')
+        if self._split_args(line, 0, USAGE_GET_LISTS) is None:
+            return
 
-        for list_ in self.__db.lists.values():
-            print(list_.disp(oneline=True))
+        self.stdout.write(''.join([f'{list_.disp(oneline=True)}\n' for list_ in self.__db.lists.values()]))
 
     def do_get_list(self, line: str) -> None:
-        args = shlex.split(line)
-        self._assert_args_len(1, args, 'get_list [<owner_name>/]<list_no>')
+        if (args := self._split_args(line, 1, USAGE_GET_LIST)) is None:
+            return
 
-        list_no = TListNo(int(args[0]))
+        list_no = self._parse_list_no(args[0])
 
-        print(self.__db.disp_list(self.__db.lists[list_no]))
+        self.stdout.write(self.__db.disp_list(self.__db.lists[list_no]) + '\n')
 
     def do_delete_list(self, line: str) -> None:
-        args = shlex.split(line)
-        self._assert_args_len(1, args, 'delete_list <list_no>')
+        if (args := self._split_args(line, 1, USAGE_DELETE_LIST)) is None:
+            return
 
         list_no = TListNo(int(args[0]))
 
-        del self.__db.lists[list_no]
+        self.__db.delete_list(list_no)
 
-        print(f'List {list_no} deleted.')
+        self.stdout.write(f'List {list_no} deleted.\n')
 
     def do_share_list(self, line: str) -> None:
-        args = shlex.split(line)
-        self._assert_args_len(3, args, 'share_list <list_no> <user_name> <reader|editer>')
+        if (args := self._split_args(line, 3, USAGE_SHARE_LIST)) is None:
+            return
 
         list_no = TListNo(int(args[0]))
-        user_name = TUserName(args[1])
+        user_name = intern_user_name(args[1])
         role = args[2]
 
         if role not in ['reader', 'editer']:
-            raise InvalidArgumentError('share_list <list_no> <user_name> <reader|editer>')
+            raise InvalidArgumentError(USAGE_SHARE_LIST)
 
         list_ = self.__db.lists[list_no]
-        auth_users = getattr(list_, f'{role}s')
+        auth_users = getattr(list_, role)
         if user_name in auth_users:
             raise InvalidArgumentError(f'{user_name} is already {role}.')
 
-        auth_users.append(user_name)
+        auth_users.add(user_name)
 
     def do_put_task(self, line: str) -> None:
-        args = shlex.split(line)
-        self._assert_args_len(2, args, 'put_task <list_no> <task_name>')
+        if (args := self._split_args(line, 2, USAGE_PUT_TASK)) is None:
+            return
 
         list_no = TListNo(int(args[0]))
         task_name = args[1]
 
-        task_no = self.__db.get_new_task_no(list_no)
+        db = self.__db
+        task_no = db.get_new_task_no(list_no)
 
-        self.__db.put_task(TTask(
+        db.put_task(TTask(
             list_no=list_no,
             task_no=task_no,
             task_name=task_name,
         ))
 
-        print(f'Task {task_no} created on List {list_no}.')
+        self.stdout.write(f'Task {task_no} created on List {list_no}.\n')
 
     def do_toggle_task(self, line: str) -> None:
-        args = shlex.split(line)
-        self._assert_args_len(2, args, 'toggle_task [<owner_name>/]<list_no> <task_no>')
+        if (args := self._split_args(line, 2, USAGE_TOGGLE_TASK)) is None:
+            return
 
-        list_no = TListNo(int(args[0]))
+        list_no, tasks = self._get_task_table(args[0])
         task_no = TTaskNo(int(args[1]))
 
-        task = self.__db.tasks[list_no][task_no]
+        task = tasks[task_no]
         task.status = not task.status
 
-        print(f'Task {task_no} toggled on List {list_no}.')
+        self.stdout.write(f'Task {task_no} toggled on List {list_no}.\n')
 
     def do_delete_task(self, line: str) -> None:
-        args = shlex.split(line)
-        self._assert_args_len(2, args, 'delete_task [<owner_name>/]<list_no> <task_no>')
+        if (args := self._split_args(line, 2, USAGE_DELETE_TASK)) is None:
+            return
 
-        list_no = TListNo(int(args[0]))
+        list_no, tasks = self._get_task_table(args[0])
         task_no = TTaskNo(int(args[1]))
 
-        del self.__db.tasks[list_no][task_no]
+        del tasks[task_no]
 
-        print(f'Task {task_no} deleted on List {list_no}.')
+        self.stdout.write(f'Task {task_no} deleted on List {list_no}.\n')
+
+    def run_script(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            if self.onecmd(self.precmd(line.rstrip('\n'))):
+                break
 
     def onecmd(self, line: str) -> bool:
+        self.wait_db_loader()
+
         try:
-            return super().onecmd(line)
+            cmd_, _, arg = line.strip().partition(' ')
+            fn = self._cmd_table.get(cmd_)
+            if fn is None:
+                return super().onecmd(line)
+
+            self.lastcmd = line
+            return bool(fn(self, arg))
         except Exception as e:
-            print(f'ERROR({type(e).__name__}): {e}')
+            self._write_error(type(e).__name__, str(e))
             return False
 
-    def postcmd(self, stop: bool, line: str) -> bool:
-        self.prompt = 'tinytodo' + (f'({self.__login})' if self.__login else '') + '> '
-        return super().postcmd(stop, line)
+
+TinyTodoShell._cmd_table = {
+    name[3:]: fn
+    for name, fn in vars(TinyTodoShell).items()
+    if name.startswith('do_')
+}
+
+
+def load_initial_data(path: pathlib.Path) -> dict[str, Any]:
+    cache_path = path.with_suffix('.pkl')
+
+    try:
+        if cache_path.stat().st_mtime >= path.stat().st_mtime:
+            data = pickle.loads(cache_path.read_bytes())
+            if isinstance(data, dict):
+                return data
+    except Exception:
+        # missing, unreadable or corrupt sidecar; rebuild it from the YAML
+        pass
+
+    import yaml
+
+    try:
+        from yaml import CSafeLoader as SafeLoader
+    except ImportError:
+        from yaml import SafeLoader  # type: ignore
+
+    data = yaml.load(path.read_bytes(), Loader=SafeLoader)
+
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, prefix=cache_path.name, suffix='.tmp')
+        try:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.fchmod(fd, 0o666 & ~umask)
+
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass
+
+    return data
 
 
 def parse_args() -> argparse.Namespace:
+    import argparse
+
     parser = argparse.ArgumentParser()
     return parser.parse_args()
 
 
 def main() -> None:
-    args = parse_args()
+    if len(sys.argv) > 1:
+        parse_args()
 
     assets_path = pathlib.Path(__file__).parent / 'assets'
     initial_data_file = assets_path / 'initial_data.yml'
 
-    initial_data = yaml.safe_load(initial_data_file.read_text())
-
     try:
         app = TinyTodoShell()
-        app._TinyTodoShell__db = TDatabase.from_dict(initial_data)  # type: ignore
-        app.cmdloop()
+        app.load_db_in_background(lambda: TDatabase.from_dict(load_initial_data(initial_data_file)))
+        if sys.stdin.isatty():
+            app.cmdloop()
+        else:
+            app.run_script(sys.stdin)
+
+        # let the loader finish writing the pickle sidecar before exiting
+        app.wait_db_loader()
     except KeyboardInterrupt:
         print('')
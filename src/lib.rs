@@ -1,5 +1,10 @@
-use pyo3::{prelude::*, types::{PyDict, PyList}};
+use pyo3::{prelude::*, types::{IntoPyDict, PyDict, PyList}};
 use cedar_policy as cedar;
+use std::borrow::{Borrow, Cow};
+use std::collections::{BTreeMap, HashMap};
+use std::hash::Hash;
+use std::sync::{Arc, Mutex, OnceLock};
+use std::sync::atomic::{AtomicU64, Ordering};
 
 
 #[pyclass]
@@ -15,48 +20,229 @@ impl EntityUid {
     }
 }
 
+/// Least-recently-used cache holding at most `capacity` entries.
+struct LruCache<K, V> {
+    capacity: usize,
+    tick: u64,
+    entries: HashMap<K, (V, u64)>,
+    order: BTreeMap<u64, K>,
+}
+
+impl<K: Clone + Eq + Hash, V> LruCache<K, V> {
+    fn new(capacity: usize) -> Self {
+        Self {
+            capacity,
+            tick: 0,
+            entries: HashMap::new(),
+            order: BTreeMap::new(),
+        }
+    }
+
+    fn get<Q>(&mut self, key: &Q) -> Option<&V>
+    where
+        K: Borrow<Q>,
+        Q: Hash + Eq + ?Sized,
+    {
+        self.tick += 1;
+        let (value, last_used) = self.entries.get_mut(key)?;
+        let key = self.order.remove(&*last_used).expect("lru order out of sync");
+        *last_used = self.tick;
+        self.order.insert(self.tick, key);
+        Some(value)
+    }
+
+    fn insert(&mut self, key: K, value: V) {
+        self.tick += 1;
+        if let Some((_, last_used)) = self.entries.remove(&key) {
+            self.order.remove(&last_used);
+        } else if self.entries.len() >= self.capacity {
+            if let Some((_, oldest)) = self.order.pop_first() {
+                self.entries.remove(&oldest);
+            }
+        }
+        self.order.insert(self.tick, key.clone());
+        self.entries.insert(key, (value, self.tick));
+    }
+
+    #[cfg(test)]
+    fn len(&self) -> usize {
+        self.entries.len()
+    }
+
+    fn clear(&mut self) {
+        self.entries.clear();
+        self.order.clear();
+    }
+}
+
+/// Returns a process-unique id, used to tell PolicySet/Entities instances apart in cache keys.
+fn next_id() -> u64 {
+    static NEXT_ID: AtomicU64 = AtomicU64::new(0);
+    NEXT_ID.fetch_add(1, Ordering::Relaxed)
+}
+
+/// (principal, action, resource, context json) as given by the caller.
+/// The context is serialised with sorted keys so equal contexts compare equal.
+type RequestKey = (Option<String>, Option<String>, Option<String>, Option<String>);
+
 #[pyclass]
-struct Request(cedar::Request);
+struct Request(cedar::Request, RequestKey);
 
 #[pymethods]
 impl Request {
     #[new]
-    fn new(principal: Option<&str>, action: Option<&str>, resource: Option<&str>, context: Option<&PyDict>, py: Python) -> Self {
-        let context = context.map(|c| {
-            let json = py.import("json").expect("failed to import json");
-            let json_str = json
-                .call_method1("dumps", (c,))
-                .expect("failed to dump json")
-                .extract::<String>()
-                .expect("failed to extract json");
-            cedar::Context::from_json_str(&json_str, None).expect("invalid context")
+    fn new(principal: Option<&str>, action: Option<&str>, resource: Option<&str>, context: Option<&PyDict>, py: Python) -> PyResult<Self> {
+        // sort_keys raises TypeError for keys that do not compare, e.g. {1: .., "a": ..}
+        let context_json = context
+            .map(|c| {
+                py.import("json")?
+                    .call_method("dumps", (c,), Some([("sort_keys", true)].into_py_dict(py)))?
+                    .extract::<String>()
+            })
+            .transpose()?;
+        let context = context_json.as_deref().map(|json_str| {
+            cedar::Context::from_json_str(json_str, None).expect("invalid context")
         }).unwrap_or_else(|| cedar::Context::empty());
 
-        Self(
+        Ok(Self(
             cedar::Request::new(
                 principal.map(|p| p.parse().unwrap()),
                 action.map(|a| a.parse().unwrap()),
                 resource.map(|r| r.parse().unwrap()),
                 context,
                 None
-            ).unwrap()
-        )
+            ).unwrap(),
+            (
+                principal.map(str::to_string),
+                action.map(str::to_string),
+                resource.map(str::to_string),
+                context_json,
+            ),
+        ))
     }
 }
 
+/// Principal or resource scope of a policy; `None` stands for an unconstrained scope.
+type ScopeKey = Option<cedar::EntityUid>;
+
+/// Policies grouped by their (principal, resource) scope.
+type ScopeIndex = HashMap<(ScopeKey, ScopeKey), Vec<cedar::Policy>>;
+
+fn scope_index(policy_set: &cedar::PolicySet) -> ScopeIndex {
+    let mut index = ScopeIndex::new();
+    for policy in policy_set.policies() {
+        let principal = match policy.principal_constraint() {
+            cedar::PrincipalConstraint::Eq(uid) | cedar::PrincipalConstraint::In(uid) => Some(uid),
+            _ => None,
+        };
+        let resource = match policy.resource_constraint() {
+            cedar::ResourceConstraint::Eq(uid) | cedar::ResourceConstraint::In(uid) => Some(uid),
+            _ => None,
+        };
+        index.entry((principal, resource)).or_default().push(policy.clone());
+    }
+    index
+}
+
+/// Scope keys a request entity can match: unconstrained, itself, and its ancestors.
+/// Each key appears once, so no policy is picked up twice.
+fn scope_keys(uid: Option<&cedar::EntityUid>, entities: Option<&Entities>) -> Vec<ScopeKey> {
+    let mut keys = vec![None];
+    if let Some(uid) = uid {
+        keys.push(Some(uid.clone()));
+        if let Some(entities) = entities {
+            for ancestor in entities.ancestors_of(uid) {
+                if ancestor != uid {
+                    keys.push(Some(ancestor.clone()));
+                }
+            }
+        }
+    }
+    keys
+}
+
+/// Parsed policies and their scope index, shared between PolicySet
+/// instances built from the same source text.
+type CompiledPolicySet = Arc<(cedar::PolicySet, ScopeIndex)>;
+
 #[pyclass]
-struct PolicySet(cedar::PolicySet);
+struct PolicySet(CompiledPolicySet, u64);
+
+const POLICY_SET_CACHE_SIZE: usize = 128;
+
+/// Parsed policy sets keyed by their source text, shared across the process.
+fn policy_set_cache() -> &'static Mutex<LruCache<String, CompiledPolicySet>> {
+    static CACHE: OnceLock<Mutex<LruCache<String, CompiledPolicySet>>> = OnceLock::new();
+    CACHE.get_or_init(|| Mutex::new(LruCache::new(POLICY_SET_CACHE_SIZE)))
+}
+
+impl PolicySet {
+    /// Policies whose scope can match the request, following the slicing
+    /// algorithm from the Cedar paper.  Policies outside the slice can never
+    /// be satisfied, so evaluating the slice gives the same decision.
+    ///
+    /// When every policy can match, the full set is borrowed instead of rebuilt.
+    fn sliced(&self, request: &cedar::Request, entities: Option<&Entities>) -> Cow<'_, cedar::PolicySet> {
+        let (policy_set, index) = &*self.0;
+        let principals = scope_keys(request.principal(), entities);
+        let resources = scope_keys(request.resource(), entities);
+
+        let mut matched = Vec::new();
+        for principal in &principals {
+            for resource in &resources {
+                if let Some(policies) = index.get(&(principal.clone(), resource.clone())) {
+                    matched.extend(policies);
+                }
+            }
+        }
+        if matched.len() == policy_set.policies().count() {
+            return Cow::Borrowed(policy_set);
+        }
+
+        let mut sliced = cedar::PolicySet::new();
+        for policy in matched {
+            sliced.add(policy.clone()).expect("failed to add policy");
+        }
+        Cow::Owned(sliced)
+    }
+}
 
 #[pymethods]
 impl PolicySet {
     #[new]
     fn new(policies_str: &str) -> Self {
-        Self(policies_str.parse().expect("invalid policies"))
+        let cache = policy_set_cache();
+        if let Some(compiled) = cache.lock().expect("poisoned policy set cache").get(policies_str) {
+            return Self(compiled.clone(), next_id());
+        }
+
+        let policy_set: cedar::PolicySet = policies_str.parse().expect("invalid policies");
+        let index = scope_index(&policy_set);
+        let compiled = Arc::new((policy_set, index));
+        cache
+            .lock()
+            .expect("poisoned policy set cache")
+            .insert(policies_str.to_string(), compiled.clone());
+        Self(compiled, next_id())
+    }
+
+    fn slice(&self, request: &Request, entities: Option<&Entities>) -> Self {
+        let policy_set = self.sliced(&request.0, entities).into_owned();
+        let index = scope_index(&policy_set);
+        Self(Arc::new((policy_set, index)), next_id())
     }
 }
 
 #[pyclass]
-struct Entities(cedar::Entities);
+struct Entities(cedar::Entities, u64);
+
+impl Entities {
+    /// Ancestors of `uid`; empty when `uid` is not in the store.
+    /// cedar keeps the transitive closure of the hierarchy, so this is a lookup.
+    fn ancestors_of<'a>(&'a self, uid: &cedar::EntityUid) -> impl Iterator<Item = &'a cedar::EntityUid> + 'a {
+        self.0.ancestors(uid).into_iter().flatten()
+    }
+}
 
 #[pymethods]
 impl Entities {
@@ -68,7 +254,22 @@ impl Entities {
             .expect("failed to dump json")
             .extract::<String>()
             .expect("failed to extract json");
-        Self(cedar::Entities::from_json_str(&json_str, None).expect("invalid entities"))
+        Self(
+            cedar::Entities::from_json_str(&json_str, None).expect("invalid entities"),
+            next_id(),
+        )
+    }
+
+    /// Kept for compatibility: ancestors are already precomputed by cedar.
+    fn prewarm(&self, _uids: Vec<&str>) {}
+}
+
+/// Evaluates `request` against the slice of `policy_set` that can apply to it.
+fn evaluate(authorizer: &cedar::Authorizer, request: &Request, policy_set: &PolicySet, entities: Option<&Entities>) -> cedar::Response {
+    let sliced = policy_set.sliced(&request.0, entities);
+    match entities {
+        Some(entities) => authorizer.is_authorized(&request.0, &sliced, &entities.0),
+        None => authorizer.is_authorized(&request.0, &sliced, &cedar::Entities::empty()),
     }
 }
 
@@ -83,12 +284,46 @@ impl Authorizer {
     }
 
     fn is_authorized(&self, request: &Request, policy_set: &PolicySet, entities: Option<&Entities>) -> Response {
-        let response = match entities {
-            Some(entities) => self.0.is_authorized(&request.0, &policy_set.0, &entities.0),
-            None => self.0.is_authorized(&request.0, &policy_set.0, &cedar::Entities::empty()),
-        };
+        Response::create(evaluate(&self.0, request, policy_set, entities))
+    }
+}
+
+/// Authorizer that memoizes decisions per request, policy set and entities.
+///
+/// PolicySet and Entities are immutable once constructed, so a decision
+/// stays valid for as long as the same instances are passed in.
+#[pyclass]
+struct CachedAuthorizer {
+    authorizer: cedar::Authorizer,
+    cache: LruCache<(RequestKey, u64, Option<u64>), cedar::Response>,
+}
+
+const AUTHORIZER_CACHE_SIZE: usize = 1024;
+
+#[pymethods]
+impl CachedAuthorizer {
+    #[new]
+    fn new() -> Self {
+        Self {
+            authorizer: cedar::Authorizer::new(),
+            cache: LruCache::new(AUTHORIZER_CACHE_SIZE),
+        }
+    }
+
+    fn is_authorized(&mut self, request: &Request, policy_set: &PolicySet, entities: Option<&Entities>) -> Response {
+        let key = (request.1.clone(), policy_set.1, entities.map(|e| e.1));
+        if let Some(response) = self.cache.get(&key) {
+            return Response::create(response.clone());
+        }
+
+        let response = evaluate(&self.authorizer, request, policy_set, entities);
+        self.cache.insert(key, response.clone());
         Response::create(response)
     }
+
+    fn clear_cache(&mut self) {
+        self.cache.clear();
+    }
 }
 
 #[pyclass]
@@ -146,6 +381,7 @@ fn yacedar(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_class::<PolicySet>()?;
     m.add_class::<Entities>()?;
     m.add_class::<Authorizer>()?;
+    m.add_class::<CachedAuthorizer>()?;
     m.add_class::<Response>()?;
     m.add_class::<Decision>()?;
     Ok(())
@@ -161,4 +397,204 @@ mod tests {
         assert_eq!(entity_uid.0.type_name().to_string(), "type");
         assert_eq!(entity_uid.0.id().to_string(), "name");
     }
+
+    #[test]
+    fn test_lru_cache_evicts_least_recently_used() {
+        let mut cache = LruCache::new(2);
+        cache.insert("a", 1);
+        cache.insert("b", 2);
+        assert_eq!(cache.get("a"), Some(&1));
+
+        cache.insert("c", 3);
+        assert_eq!(cache.len(), 2);
+        assert_eq!(cache.get("b"), None);
+        assert_eq!(cache.get("a"), Some(&1));
+        assert_eq!(cache.get("c"), Some(&3));
+    }
+
+    fn request(principal: &str, action: &str, resource: &str) -> Request {
+        Request(
+            cedar::Request::new(
+                Some(principal.parse().unwrap()),
+                Some(action.parse().unwrap()),
+                Some(resource.parse().unwrap()),
+                cedar::Context::empty(),
+                None,
+            ).unwrap(),
+            (Some(principal.to_string()), Some(action.to_string()), Some(resource.to_string()), None),
+        )
+    }
+
+    #[test]
+    fn test_cached_authorizer_hit_and_miss() {
+        let src = r#"permit(principal == User::"alice", action, resource);"#;
+        let policy_set = PolicySet::new(src);
+        let alice = request(r#"User::"alice""#, r#"Action::"view""#, r#"Photo::"a.jpg""#);
+        let bob = request(r#"User::"bob""#, r#"Action::"view""#, r#"Photo::"a.jpg""#);
+        let mut authorizer = CachedAuthorizer::new();
+
+        assert!(authorizer.is_authorized(&alice, &policy_set, None).is_allowed);
+        assert_eq!(authorizer.cache.len(), 1);
+
+        // same request, policy set and entities: served from the cache
+        assert!(authorizer.is_authorized(&alice, &policy_set, None).is_allowed);
+        assert_eq!(authorizer.cache.len(), 1);
+
+        assert!(!authorizer.is_authorized(&bob, &policy_set, None).is_allowed);
+        assert_eq!(authorizer.cache.len(), 2);
+
+        // a different PolicySet instance is a different key
+        let other = PolicySet::new(src);
+        assert!(authorizer.is_authorized(&alice, &other, None).is_allowed);
+        assert_eq!(authorizer.cache.len(), 3);
+
+        authorizer.clear_cache();
+        assert_eq!(authorizer.cache.len(), 0);
+    }
+
+    fn entities(json: &str) -> Entities {
+        Entities(
+            cedar::Entities::from_json_str(json, None).unwrap(),
+            next_id(),
+        )
+    }
+
+    /// Checks that slicing does not change the decision and returns whether it is Allow.
+    fn decide(policy_set: &PolicySet, request: &Request, entities: Option<&Entities>) -> bool {
+        let authorizer = cedar::Authorizer::new();
+        let empty = cedar::Entities::empty();
+        let cedar_entities = entities.map(|e| &e.0).unwrap_or(&empty);
+
+        let full = authorizer.is_authorized(&request.0, &policy_set.0.0, cedar_entities);
+        let sliced = policy_set.sliced(&request.0, entities);
+        let sliced = authorizer.is_authorized(&request.0, &sliced, cedar_entities);
+        assert_eq!(full.decision(), sliced.decision());
+
+        full.decision() == cedar::Decision::Allow
+    }
+
+    const HIERARCHY: &str = r#"[
+        {"uid": {"type": "User", "id": "alice"}, "attrs": {}, "parents": [{"type": "Team", "id": "ops"}]},
+        {"uid": {"type": "Team", "id": "ops"}, "attrs": {}, "parents": [{"type": "Group", "id": "admins"}]},
+        {"uid": {"type": "Group", "id": "admins"}, "attrs": {}, "parents": []},
+        {"uid": {"type": "User", "id": "bob"}, "attrs": {}, "parents": []}
+    ]"#;
+
+    fn ancestor_ids(entities: &Entities, uid: &str) -> Vec<String> {
+        let mut ids: Vec<String> = entities.ancestors_of(&uid.parse().unwrap()).map(|a| a.to_string()).collect();
+        ids.sort();
+        ids
+    }
+
+    #[test]
+    fn test_entities_ancestors_of() {
+        let entities = entities(HIERARCHY);
+        entities.prewarm(vec![r#"User::"alice""#, r#"User::"nobody""#]);
+
+        assert_eq!(ancestor_ids(&entities, r#"User::"alice""#), vec![r#"Group::"admins""#, r#"Team::"ops""#]);
+        assert_eq!(ancestor_ids(&entities, r#"Team::"ops""#), vec![r#"Group::"admins""#]);
+        assert!(ancestor_ids(&entities, r#"User::"bob""#).is_empty());
+        assert!(ancestor_ids(&entities, r#"User::"nobody""#).is_empty());
+    }
+
+    #[test]
+    fn test_slice_principal_in_group_through_ancestor() {
+        let policy_set = PolicySet::new(r#"permit(principal in Group::"admins", action, resource);"#);
+        let entities = entities(HIERARCHY);
+        let alice = request(r#"User::"alice""#, r#"Action::"view""#, r#"Photo::"a.jpg""#);
+        let bob = request(r#"User::"bob""#, r#"Action::"view""#, r#"Photo::"a.jpg""#);
+
+        assert!(decide(&policy_set, &alice, Some(&entities)));
+        assert!(!decide(&policy_set, &bob, Some(&entities)));
+        assert_eq!(policy_set.sliced(&alice.0, Some(&entities)).policies().count(), 1);
+        assert_eq!(policy_set.sliced(&bob.0, Some(&entities)).policies().count(), 0);
+    }
+
+    #[test]
+    fn test_slice_resource_eq() {
+        let policy_set = PolicySet::new(r#"permit(principal, action, resource == Photo::"a.jpg");"#);
+        let a = request(r#"User::"bob""#, r#"Action::"view""#, r#"Photo::"a.jpg""#);
+        let b = request(r#"User::"bob""#, r#"Action::"view""#, r#"Photo::"b.jpg""#);
+
+        assert!(decide(&policy_set, &a, None));
+        assert!(!decide(&policy_set, &b, None));
+    }
+
+    #[test]
+    fn test_slice_unconstrained_scope() {
+        let policy_set = PolicySet::new(r#"permit(principal, action == Action::"view", resource);"#);
+        let entities = entities(HIERARCHY);
+        let view = request(r#"User::"alice""#, r#"Action::"view""#, r#"Photo::"a.jpg""#);
+        let edit = request(r#"User::"alice""#, r#"Action::"edit""#, r#"Photo::"a.jpg""#);
+
+        assert!(decide(&policy_set, &view, Some(&entities)));
+        assert!(decide(&policy_set, &view, None));
+        assert!(!decide(&policy_set, &edit, Some(&entities)));
+    }
+
+    #[test]
+    fn test_slice_without_entities() {
+        let policy_set = PolicySet::new(r#"
+            permit(principal in Group::"admins", action == Action::"edit", resource);
+            permit(principal == User::"alice", action == Action::"view", resource);
+        "#);
+        let view = request(r#"User::"alice""#, r#"Action::"view""#, r#"Photo::"a.jpg""#);
+        let edit = request(r#"User::"alice""#, r#"Action::"edit""#, r#"Photo::"a.jpg""#);
+
+        assert!(decide(&policy_set, &view, None));
+        assert!(!decide(&policy_set, &edit, None));
+        assert!(decide(&policy_set, &edit, Some(&entities(HIERARCHY))));
+    }
+
+    #[test]
+    fn test_slice_borrows_when_every_policy_matches() {
+        let policy_set = PolicySet::new(r#"
+            permit(principal, action == Action::"view", resource);
+            forbid(principal == User::"alice", action, resource);
+        "#);
+        let alice = request(r#"User::"alice""#, r#"Action::"view""#, r#"Photo::"a.jpg""#);
+        let bob = request(r#"User::"bob""#, r#"Action::"view""#, r#"Photo::"a.jpg""#);
+
+        assert!(matches!(policy_set.sliced(&alice.0, None), Cow::Borrowed(_)));
+        assert!(matches!(policy_set.sliced(&bob.0, None), Cow::Owned(_)));
+        assert!(!decide(&policy_set, &alice, None));
+        assert!(decide(&policy_set, &bob, None));
+    }
+
+    #[test]
+    fn test_slice_forbid_overrides_permit() {
+        let policy_set = PolicySet::new(r#"
+            permit(principal, action, resource);
+            forbid(principal in Group::"admins", action, resource == Photo::"secret.jpg");
+        "#);
+        let entities = entities(HIERARCHY);
+        let alice_secret = request(r#"User::"alice""#, r#"Action::"view""#, r#"Photo::"secret.jpg""#);
+        let alice_public = request(r#"User::"alice""#, r#"Action::"view""#, r#"Photo::"a.jpg""#);
+        let bob_secret = request(r#"User::"bob""#, r#"Action::"view""#, r#"Photo::"secret.jpg""#);
+
+        assert!(!decide(&policy_set, &alice_secret, Some(&entities)));
+        assert!(decide(&policy_set, &alice_public, Some(&entities)));
+        assert!(decide(&policy_set, &bob_secret, Some(&entities)));
+    }
+
+    fn policy_texts(policy_set: &cedar::PolicySet) -> Vec<String> {
+        let mut texts: Vec<String> = policy_set.policies().map(|p| p.to_string()).collect();
+        texts.sort();
+        texts
+    }
+
+    #[test]
+    fn test_policy_set_cache_hit() {
+        let src = r#"
+            permit(principal == User::"cache-test", action, resource);
+            forbid(principal, action == Action::"delete", resource);
+        "#;
+        let first = PolicySet::new(src);
+        assert!(policy_set_cache().lock().unwrap().get(src).is_some());
+
+        let second = PolicySet::new(src);
+        assert_ne!(first.1, second.1);
+        assert!(Arc::ptr_eq(&first.0, &second.0));
+        assert_eq!(policy_texts(&first.0.0), policy_texts(&second.0.0));
+    }
 }
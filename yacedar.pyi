@@ -15,14 +15,21 @@ class Request:
 
 class PolicySet:
     def __new__(cls, policies_str: str) -> PolicySet: ...
+    def slice(self, request: Request, entities: Entities | None = None) -> PolicySet: ...
 
 class Entities:
     def __new__(cls, entities: list[dict[str, Any]]) -> Entities: ...
+    def prewarm(self, uids: list[str]) -> None: ...
 
 class Authorizer:
     def __new__(cls) -> Authorizer: ...
     def is_authorized(self, request: Request, policy_set: PolicySet, entities: Entities | None = None) -> Response: ...
 
+class CachedAuthorizer:
+    def __new__(cls) -> CachedAuthorizer: ...
+    def is_authorized(self, request: Request, policy_set: PolicySet, entities: Entities | None = None) -> Response: ...
+    def clear_cache(self) -> None: ...
+
 class Response:
     decision: Decision
     is_allowed: bool